@@ -3,26 +3,49 @@ import os
 
 import aws_cdk as cdk
 
-from bot_compras.bot_compras_stack import BotComprasStack
+from bot_compras.bot_compras_stack import BotComprasStack, build_regional_stacks
 
 
-app = cdk.App()
-BotComprasStack(app, "BotComprasStack",
-    # If you don't specify 'env', this stack will be environment-agnostic.
-    # Account/Region-dependent features and context lookups will not work,
-    # but a single synthesized template can be deployed anywhere.
-
-    # Uncomment the next line to specialize this stack for the AWS Account
-    # and Region that are implied by the current CLI configuration.
 
-    #env=cdk.Environment(account=os.getenv('CDK_DEFAULT_ACCOUNT'), region=os.getenv('CDK_DEFAULT_REGION')),
+def context_list(value):
+    """Los valores pasados con -c llegan como texto: aceptar 'a,b' además de listas JSON"""
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(",") if item.strip()]
+    return list(value or [])
 
-    # Uncomment the next line if you know exactly what Account and Region you
-    # want to deploy the stack to. */
 
-    #env=cdk.Environment(account='123456789012', region='us-east-1'),
+app = cdk.App()
 
-    # For more information, see https://docs.aws.amazon.com/cdk/latest/guide/environments.html
-    )
+# Multi-región desactivado por defecto (cdk.json); se activa con -c bot-compras:primaryRegion=<región>
+primary_region = app.node.try_get_context("bot-compras:primaryRegion")
+
+if primary_region:
+    # Un stack por región detrás de un registro DNS con enrutamiento por latencia
+    build_regional_stacks(app, "BotComprasStack",
+        primary_region=primary_region,
+        replica_regions=context_list(app.node.try_get_context("bot-compras:replicaRegions")),
+        account=os.getenv('CDK_DEFAULT_ACCOUNT'),
+        domain_name=app.node.try_get_context("bot-compras:domainName") or None,
+        hosted_zone_id=app.node.try_get_context("bot-compras:hostedZoneId") or None,
+        hosted_zone_name=app.node.try_get_context("bot-compras:hostedZoneName") or None,
+        )
+else:
+    BotComprasStack(app, "BotComprasStack",
+        # If you don't specify 'env', this stack will be environment-agnostic.
+        # Account/Region-dependent features and context lookups will not work,
+        # but a single synthesized template can be deployed anywhere.
+
+        # Uncomment the next line to specialize this stack for the AWS Account
+        # and Region that are implied by the current CLI configuration.
+
+        #env=cdk.Environment(account=os.getenv('CDK_DEFAULT_ACCOUNT'), region=os.getenv('CDK_DEFAULT_REGION')),
+
+        # Uncomment the next line if you know exactly what Account and Region you
+        # want to deploy the stack to. */
+
+        #env=cdk.Environment(account='123456789012', region='us-east-1'),
+
+        # For more information, see https://docs.aws.amazon.com/cdk/latest/guide/environments.html
+        )
 
 app.synth()
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Exportación y consultas analíticas sobre el historial de conversaciones.
+
+El job de exportación recorre la tabla DynamoDB `conversaciones` con un scan
+paralelo (un hilo por segmento, cliente de bajo nivel y páginas de 1 MB) y
+escribe archivos Parquet por bloques, de modo que la memoria queda acotada por
+`segmentos * chunk_size` y no por el tamaño de la tabla. Se generan dos
+datasets:
+
+    <salida>/turnos/seg*-part-*.parquet     una fila por turno
+    <salida>/productos/seg*-part-*.parquet  una fila por producto mostrado
+
+El scan consume capacidad de lectura de la tabla. Para volcados completos de
+decenas de millones de turnos es preferible `ExportTableToPointInTime` (requiere
+PITR) hacia S3 y convertir ese volcado; este job cubre las exportaciones
+incrementales y las tablas medianas.
+
+`latencia_ms` es el tiempo de la Lambda desde que recibe el evento hasta tener
+la respuesta completa, incluida la síntesis con Polly y la subida a S3; no
+incluye la escritura del propio turno en DynamoDB ni el tiempo de API Gateway.
+
+Las consultas leen esos archivos por lotes (pyarrow.dataset) y agregan con
+operaciones vectorizadas de NumPy/Arrow, acumulando solo contadores.
+
+Uso:
+    python -m bot_compras.analytics export salida/ [--segmentos 16]
+    python -m bot_compras.analytics report salida/
+"""
+import argparse
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+TABLA_CONVERSACIONES = 'conversaciones'
+
+ESQUEMA_TURNOS = pa.schema([
+    ('user_email', pa.string()),
+    ('timestamp', pa.string()),
+    ('mensaje', pa.string()),
+    ('intencion', pa.string()),
+    ('num_productos', pa.int32()),
+    ('latencia_ms', pa.int32()),
+])
+
+ESQUEMA_PRODUCTOS = pa.schema([
+    ('user_email', pa.string()),
+    ('timestamp', pa.string()),
+    ('intencion', pa.string()),
+    ('categoria', pa.string()),
+    ('nombre', pa.string()),
+    ('costo', pa.float64()),
+])
+
+# Límites superiores (USD) de las bandas de precio; el último tramo es abierto
+BANDAS_PRECIO = (250.0, 500.0, 1000.0, 2000.0)
+
+# Categoría del catálogo (init_database.py) según la primera palabra del nombre,
+# para los turnos guardados antes de que los productos incluyeran `categoria`
+CATEGORIAS_POR_TIPO = {
+    'Refrigerador': 'Refrigeración',
+    'Lavadora': 'Lavandería',
+    'Microondas': 'Cocina',
+    'Lavavajillas': 'Cocina',
+    'Aspiradora': 'Limpieza',
+}
+
+# El timeout de la Lambda es de 30 s: histograma de 1 ms hasta ese límite
+LATENCIA_MAX_MS = 30000
+
+
+def iter_paginas(client, table_name=TABLA_CONVERSACIONES, segmento=0, segmentos=1):
+    """Recorrer un segmento de la tabla con el cliente de bajo nivel, devolviendo una página a la vez"""
+    kwargs = {
+        'TableName': table_name,
+        'ProjectionExpression': 'user_email, #ts, mensaje, intencion, productos_mostrados, latencia_ms',
+        'ExpressionAttributeNames': {'#ts': 'timestamp'},
+    }
+    if segmentos > 1:
+        kwargs['Segment'] = segmento
+        kwargs['TotalSegments'] = segmentos
+
+    # Sin Limit: DynamoDB devuelve páginas de hasta 1 MB
+    for response in client.get_paginator('scan').paginate(**kwargs):
+        yield response.get('Items', [])
+
+
+def categoria_producto(producto):
+    """Categoría del producto; si no viene informada se deduce del nombre con las categorías del catálogo"""
+    categoria = producto.get('categoria')
+    if categoria:
+        return categoria
+    nombre = producto.get('nombre') or ''
+    return CATEGORIAS_POR_TIPO.get(nombre.split(' ', 1)[0], 'desconocida')
+
+
+def _texto(atributo):
+    return atributo.get('S') if atributo else None
+
+
+def _entero(atributo):
+    return int(atributo['N']) if atributo and 'N' in atributo else None
+
+
+def columnas_de_pagina(items):
+    """Convertir una página del scan (formato del cliente de bajo nivel) en columnas de turnos y productos"""
+    turnos = {nombre: [] for nombre in ESQUEMA_TURNOS.names}
+    productos = {nombre: [] for nombre in ESQUEMA_PRODUCTOS.names}
+
+    for item in items:
+        user_email = _texto(item.get('user_email'))
+        timestamp = _texto(item.get('timestamp'))
+        # Antes de registrar la intención solo se guardaban los turnos de compra
+        intencion = _texto(item.get('intencion')) or 'compra'
+        try:
+            mostrados = json.loads(_texto(item.get('productos_mostrados')) or '[]')
+        except ValueError:
+            mostrados = []
+
+        turnos['user_email'].append(user_email)
+        turnos['timestamp'].append(timestamp)
+        turnos['mensaje'].append(_texto(item.get('mensaje')))
+        turnos['intencion'].append(intencion)
+        turnos['num_productos'].append(len(mostrados))
+        turnos['latencia_ms'].append(_entero(item.get('latencia_ms')))
+
+        for producto in mostrados:
+            costo = producto.get('costo')
+            productos['user_email'].append(user_email)
+            productos['timestamp'].append(timestamp)
+            productos['intencion'].append(intencion)
+            productos['categoria'].append(categoria_producto(producto))
+            productos['nombre'].append(producto.get('nombre'))
+            productos['costo'].append(float(costo) if costo is not None else None)
+
+    return turnos, productos
+
+
+class _EscritorPorBloques:
+    """Acumula lotes de Arrow y escribe un archivo Parquet cada `chunk_size` filas"""
+
+    def __init__(self, directorio, esquema, chunk_size, prefijo):
+        self.directorio = directorio
+        self.esquema = esquema
+        self.chunk_size = chunk_size
+        self.prefijo = prefijo
+        self.partes = 0
+        self.filas = 0
+        self._lotes = []
+        self._pendientes = 0
+        os.makedirs(directorio, exist_ok=True)
+
+    def agregar(self, columnas):
+        lote = pa.RecordBatch.from_pydict(columnas, schema=self.esquema)
+        if not lote.num_rows:
+            return
+        self._lotes.append(lote)
+        self._pendientes += lote.num_rows
+        if self._pendientes >= self.chunk_size:
+            self.vaciar()
+
+    def vaciar(self):
+        if not self._pendientes:
+            return
+        tabla = pa.Table.from_batches(self._lotes, schema=self.esquema)
+        ruta = os.path.join(self.directorio, f"{self.prefijo}part-{self.partes:05d}.parquet")
+        pq.write_table(tabla, ruta, compression='zstd')
+        self.partes += 1
+        self.filas += self._pendientes
+        self._lotes = []
+        self._pendientes = 0
+
+
+def _exportar_segmento(salida, paginas, segmento, chunk_size):
+    """Escribir las páginas de un segmento con su propio prefijo; devuelve (turnos, productos)"""
+    prefijo = f"seg{segmento:03d}-"
+    turnos = _EscritorPorBloques(os.path.join(salida, 'turnos'), ESQUEMA_TURNOS, chunk_size, prefijo)
+    productos = _EscritorPorBloques(os.path.join(salida, 'productos'), ESQUEMA_PRODUCTOS, chunk_size, prefijo)
+
+    for items in paginas:
+        columnas_turnos, columnas_productos = columnas_de_pagina(items)
+        turnos.agregar(columnas_turnos)
+        productos.agregar(columnas_productos)
+
+    turnos.vaciar()
+    productos.vaciar()
+    return turnos.filas, productos.filas
+
+
+def _preparar_salida(salida, sobrescribir):
+    """Evitar mezclar archivos de exportaciones anteriores, que se contarían dos veces"""
+    for dataset in ('turnos', 'productos'):
+        ruta = os.path.join(salida, dataset)
+        if not os.path.isdir(ruta) or not os.listdir(ruta):
+            continue
+        if not sobrescribir:
+            raise FileExistsError(f"{ruta} ya contiene una exportación; use sobrescribir=True (--sobrescribir)")
+        shutil.rmtree(ruta)
+
+
+def exportar_conversaciones(salida, paginas=None, table_name=TABLA_CONVERSACIONES,
+                            segmentos=8, chunk_size=250000, sobrescribir=False):
+    """Exportar el historial a Parquet con un scan paralelo; devuelve (turnos, productos) escritos"""
+    if segmentos < 1:
+        raise ValueError(f"segmentos debe ser al menos 1 (recibido {segmentos})")
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size debe ser al menos 1 (recibido {chunk_size})")
+    _preparar_salida(salida, sobrescribir)
+
+    if paginas is not None:
+        # Páginas ya leídas (p. ej. de un volcado): un único segmento
+        resultados = [_exportar_segmento(salida, paginas, 0, chunk_size)]
+    else:
+        # Los clientes de boto3 son seguros entre hilos; cada segmento escribe sus propios archivos
+        client = boto3.client('dynamodb')
+        with ThreadPoolExecutor(max_workers=segmentos) as pool:
+            futuros = [
+                pool.submit(_exportar_segmento, salida,
+                            iter_paginas(client, table_name, segmento, segmentos),
+                            segmento, chunk_size)
+                for segmento in range(segmentos)
+            ]
+            resultados = [futuro.result() for futuro in futuros]
+
+    return sum(t for t, _ in resultados), sum(p for _, p in resultados)
+
+
+ESQUEMAS = {'turnos': ESQUEMA_TURNOS, 'productos': ESQUEMA_PRODUCTOS}
+
+
+def _lotes(salida, dataset, columnas):
+    """Iterar los RecordBatch de un dataset leyendo solo las columnas pedidas"""
+    ruta = os.path.join(salida, dataset)
+    if not os.path.isdir(ruta):
+        return iter(())
+    # Esquema explícito: un directorio sin archivos (p. ej. ningún producto mostrado) no tiene columnas que inferir
+    return ds.dataset(ruta, format='parquet', schema=ESQUEMAS[dataset]).to_batches(columns=columnas)
+
+
+def _sumar_conteos(acumulado, conteos):
+    for par in conteos.to_pylist():
+        clave = par['values']
+        acumulado[clave] = acumulado.get(clave, 0) + par['counts']
+
+
+def mezcla_intenciones(salida):
+    """Cantidad de turnos por intención"""
+    conteos = {}
+    for lote in _lotes(salida, 'turnos', ['intencion']):
+        _sumar_conteos(conteos, pc.value_counts(lote.column('intencion')))
+    return conteos
+
+
+def productos_por_turno(salida):
+    """Histograma de productos mostrados por turno: {num_productos: turnos}"""
+    histograma = np.zeros(0, dtype=np.int64)
+    for lote in _lotes(salida, 'turnos', ['num_productos']):
+        valores = lote.column('num_productos').fill_null(0).to_numpy()
+        conteos = np.bincount(valores)
+        if len(conteos) > len(histograma):
+            histograma = np.pad(histograma, (0, len(conteos) - len(histograma)))
+        histograma[:len(conteos)] += conteos
+    return {int(n): int(c) for n, c in enumerate(histograma) if c}
+
+
+def distribucion_latencia(salida, percentiles=(50, 90, 95, 99)):
+    """Percentiles de `latencia_ms` (respuesta completa de la Lambda) sobre un histograma de 1 ms"""
+    histograma = np.zeros(LATENCIA_MAX_MS + 1, dtype=np.int64)
+    for lote in _lotes(salida, 'turnos', ['latencia_ms']):
+        valores = lote.column('latencia_ms').drop_null().to_numpy()
+        valores = np.clip(valores, 0, LATENCIA_MAX_MS)
+        histograma += np.bincount(valores, minlength=LATENCIA_MAX_MS + 1)
+
+    total = int(histograma.sum())
+    if not total:
+        return {'total': 0}
+    acumulado = np.cumsum(histograma)
+    resultado = {'total': total}
+    for p in percentiles:
+        resultado[f"p{p}"] = int(np.searchsorted(acumulado, total * p / 100.0))
+    return resultado
+
+
+def etiqueta_banda(indice, bandas=BANDAS_PRECIO):
+    """Texto legible de la banda de precio `indice` según `np.digitize`"""
+    if indice == 0:
+        return f"<{bandas[0]:g}"
+    if indice >= len(bandas):
+        return f">={bandas[-1]:g}"
+    return f"{bandas[indice - 1]:g}-{bandas[indice]:g}"
+
+
+def categorias_y_bandas(salida, bandas=BANDAS_PRECIO):
+    """Productos mostrados por (categoría, banda de precio)"""
+    limites = np.asarray(bandas, dtype=np.float64)
+    num_bandas = len(limites) + 1
+    conteos = {}
+    for lote in _lotes(salida, 'productos', ['categoria', 'costo']):
+        lote = lote.filter(pc.is_valid(lote.column('costo')))
+        if not lote.num_rows:
+            continue
+        categorias = pc.dictionary_encode(lote.column('categoria').fill_null('desconocida'))
+        indices = categorias.indices.to_numpy()
+        bandas_lote = np.digitize(lote.column('costo').to_numpy(), limites)
+        # Agrupar por (categoría, banda) con una sola pasada de bincount
+        claves = indices.astype(np.int64) * num_bandas + bandas_lote
+        por_clave = np.bincount(claves, minlength=len(categorias.dictionary) * num_bandas)
+        for clave in np.flatnonzero(por_clave):
+            categoria = categorias.dictionary[clave // num_bandas].as_py()
+            banda = etiqueta_banda(clave % num_bandas, bandas)
+            conteos[(categoria, banda)] = conteos.get((categoria, banda), 0) + int(por_clave[clave])
+    return conteos
+
+
+def imprimir_reporte(salida):
+    """Imprimir las métricas del embudo"""
+    print("📊 Mezcla de intenciones")
+    for intencion, cantidad in sorted(mezcla_intenciones(salida).items(), key=lambda x: -x[1]):
+        print(f"   {intencion:20} {cantidad}")
+
+    print("\n🛒 Productos mostrados por turno")
+    for num, cantidad in productos_por_turno(salida).items():
+        print(f"   {num:>3} productos      {cantidad}")
+
+    print("\n⚡ Latencia de respuesta (ms)")
+    for clave, valor in distribucion_latencia(salida).items():
+        print(f"   {clave:20} {valor}")
+
+    print("\n🏷️  Categorías y bandas de precio")
+    for (categoria, banda), cantidad in sorted(categorias_y_bandas(salida).items(), key=lambda x: -x[1]):
+        print(f"   {categoria:20} {banda:12} {cantidad}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analítica del historial de conversaciones")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    export_parser = subparsers.add_parser('export', help="Exportar DynamoDB a Parquet")
+    export_parser.add_argument('salida')
+    export_parser.add_argument('--tabla', default=TABLA_CONVERSACIONES)
+    export_parser.add_argument('--segmentos', type=int, default=8,
+                               help="Segmentos del scan paralelo (un hilo por segmento)")
+    export_parser.add_argument('--chunk-size', type=int, default=250000)
+    export_parser.add_argument('--sobrescribir', action='store_true',
+                               help="Borrar una exportación previa en el mismo directorio")
+
+    report_parser = subparsers.add_parser('report', help="Métricas del embudo sobre la exportación")
+    report_parser.add_argument('salida')
+
+    args = parser.parse_args()
+    if args.comando == 'export':
+        if args.segmentos < 1:
+            parser.error("--segmentos debe ser al menos 1")
+        if args.chunk_size < 1:
+            parser.error("--chunk-size debe ser al menos 1")
+        turnos, productos = exportar_conversaciones(
+            args.salida,
+            table_name=args.tabla,
+            segmentos=args.segmentos,
+            chunk_size=args.chunk_size,
+            sobrescribir=args.sobrescribir
+        )
+        print(f"✅ Exportados {turnos} turnos y {productos} productos mostrados")
+    else:
+        imprimir_reporte(args.salida)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,41 +9,60 @@ from aws_cdk import (
     aws_s3 as s3,
     aws_iam as iam,
     aws_logs as logs,
-    CfnOutput
+    aws_route53 as route53,
+    aws_route53_targets as targets,
+    aws_certificatemanager as acm,
+    CfnOutput,
+    Environment
 )
 from constructs import Construct
 
 class BotComprasStack(Stack):
 
-    def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
+    def __init__(self, scope: Construct, construct_id: str,
+                 primary_region: str = None,
+                 replica_regions: list = None,
+                 domain_name: str = None,
+                 hosted_zone_id: str = None,
+                 hosted_zone_name: str = None,
+                 **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
-        # Cognito User Pool
-        user_pool = cognito.UserPool(self, "BotUserPool",
-            user_pool_name="bot-compras-users",
-            sign_in_aliases=cognito.SignInAliases(email=True),
-            auto_verify=cognito.AutoVerifiedAttrs(email=True),
-            password_policy=cognito.PasswordPolicy(
-                min_length=8,
-                require_lowercase=True,
-                require_uppercase=True,
-                require_digits=True
-            ),
-            removal_policy=RemovalPolicy.DESTROY
-        )
+        # Sin primary_region el stack es de una sola región (despliegue original)
+        multi_region = primary_region is not None
+        is_primary = not multi_region or self.region == primary_region
 
-        # Cognito User Pool Client
-        user_pool_client = cognito.UserPoolClient(self, "BotUserPoolClient",
-            user_pool=user_pool,
-            auth_flows=cognito.AuthFlow(
-                user_password=True,
-                user_srp=True,
-                admin_user_password=True  # Habilitar ADMIN_NO_SRP_AUTH
-            ),
-            generate_secret=False
-        )
+        if domain_name and not (hosted_zone_id and hosted_zone_name):
+            raise ValueError("domain_name requiere hosted_zone_id y hosted_zone_name")
+
+        # Cognito solo en la región primaria: un único directorio de usuarios
+        if is_primary:
+            # Cognito User Pool
+            user_pool = cognito.UserPool(self, "BotUserPool",
+                user_pool_name="bot-compras-users",
+                sign_in_aliases=cognito.SignInAliases(email=True),
+                auto_verify=cognito.AutoVerifiedAttrs(email=True),
+                password_policy=cognito.PasswordPolicy(
+                    min_length=8,
+                    require_lowercase=True,
+                    require_uppercase=True,
+                    require_digits=True
+                ),
+                removal_policy=RemovalPolicy.DESTROY
+            )
 
-        # S3 Bucket para audio
+            # Cognito User Pool Client
+            user_pool_client = cognito.UserPoolClient(self, "BotUserPoolClient",
+                user_pool=user_pool,
+                auth_flows=cognito.AuthFlow(
+                    user_password=True,
+                    user_srp=True,
+                    admin_user_password=True  # Habilitar ADMIN_NO_SRP_AUTH
+                ),
+                generate_secret=False
+            )
+
+        # S3 Bucket para audio (uno por región)
         audio_bucket = s3.Bucket(self, "AudioBucket",
             versioned=False,
             encryption=s3.BucketEncryption.S3_MANAGED,
@@ -65,20 +84,47 @@ class BotComprasStack(Stack):
             auto_delete_objects=True
         )
 
-        # DynamoDB para historial
-        conversations_table = dynamodb.Table(self, "ConversationsTable",
-            table_name="conversaciones",
-            partition_key=dynamodb.Attribute(
-                name="user_email",
-                type=dynamodb.AttributeType.STRING
-            ),
-            sort_key=dynamodb.Attribute(
-                name="timestamp",
-                type=dynamodb.AttributeType.STRING
-            ),
-            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
-            removal_policy=RemovalPolicy.DESTROY
+        conversations_partition_key = dynamodb.Attribute(
+            name="user_email",
+            type=dynamodb.AttributeType.STRING
+        )
+        conversations_sort_key = dynamodb.Attribute(
+            name="timestamp",
+            type=dynamodb.AttributeType.STRING
         )
+        catalog_partition_key = dynamodb.Attribute(
+            name="id",
+            type=dynamodb.AttributeType.NUMBER
+        )
+
+        if is_primary:
+            # En multi-región la misma tabla se convierte en global en el sitio
+            # (réplicas añadidas con UpdateTable): conserva tipo, id lógico y datos
+            replication_regions = list(replica_regions) if multi_region and replica_regions else None
+
+            # DynamoDB para historial (se conserva aunque se elimine el stack)
+            conversations_table = dynamodb.Table(self, "ConversationsTable",
+                table_name="conversaciones",
+                partition_key=conversations_partition_key,
+                sort_key=conversations_sort_key,
+                billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+                replication_regions=replication_regions,
+                replica_removal_policy=RemovalPolicy.RETAIN if replication_regions else None,
+                removal_policy=RemovalPolicy.RETAIN
+            )
+
+            # DynamoDB para el snapshot del catálogo
+            catalog_table = dynamodb.Table(self, "CatalogTable",
+                table_name="catalogo",
+                partition_key=catalog_partition_key,
+                billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+                replication_regions=replication_regions,
+                removal_policy=RemovalPolicy.DESTROY
+            )
+        else:
+            # Réplicas locales creadas por el stack primario (mismo nombre en cada región)
+            conversations_table = dynamodb.Table.from_table_name(self, "ConversationsTable", "conversaciones")
+            catalog_table = dynamodb.Table.from_table_name(self, "CatalogTable", "catalogo")
 
         # IAM Role para Lambdas
         lambda_role = iam.Role(self, "LambdaExecutionRole",
@@ -113,10 +159,50 @@ class BotComprasStack(Stack):
             handler="index.lambda_handler",  # Cambiar handler para código inline
             code=_lambda.Code.from_inline(f"""
 import json
+import os
+import time
 import boto3
 from datetime import datetime
 
+# Recursos de la región donde corre la Lambda; los clientes se reutilizan entre invocaciones
+REGION = os.environ.get('AWS_REGION')
+TABLE_NAME = os.environ.get('DYNAMODB_TABLE')
+CATALOG_TABLE = os.environ.get('CATALOG_TABLE')
+S3_BUCKET = os.environ.get('S3_BUCKET')
+AUDIO_BUCKET_DOMAIN = os.environ.get('AUDIO_BUCKET_DOMAIN')
+
+dynamodb = boto3.resource('dynamodb', region_name=REGION)
+CATALOGO = None
+
+def cargar_catalogo():
+    # Snapshot del catálogo replicado, leído una vez por contenedor. Un catálogo vacío
+    # (aún sin cargar o sin replicar a esta región) no se guarda y se vuelve a leer
+    global CATALOGO
+    if not CATALOGO:
+        try:
+            items = dynamodb.Table(CATALOG_TABLE).scan().get('Items', [])
+        except Exception as e:
+            print(f"Error leyendo catálogo: {{e}}")
+            return []
+        # El scan no garantiza orden: por id, todas las regiones muestran los mismos productos
+        items.sort(key=lambda item: item['id'])
+        catalogo = [
+            {{
+                "nombre": item['nombre'],
+                "categoria": item.get('categoria'),
+                "costo": float(item['costo']),
+                "url_producto": item['url_producto'],
+                "descripcion": item.get('descripcion', '')
+            }}
+            for item in items
+        ]
+        if not catalogo:
+            return []
+        CATALOGO = catalogo
+    return CATALOGO
+
 def lambda_handler(event, context):
+    inicio = time.time()
     try:
         # Parsear el cuerpo de la solicitud
         if 'body' in event:
@@ -133,6 +219,7 @@ def lambda_handler(event, context):
         
         if intencion == 'soporte':
             respuesta = "Este canal es solo para asistencia de compras. Para soporte técnico, contacte nuestro departamento especializado."
+            mensaje_procesado = mensaje
             productos = []
             audio_url = None
         else:
@@ -146,7 +233,7 @@ def lambda_handler(event, context):
             # 3. Generar respuesta (simulado - en producción usar Bedrock)
             respuesta = "¡Hola! Te ayudo a encontrar el electrodoméstico perfecto. Para recomendarte mejor, ¿podrías decirme qué tipo de electrodoméstico buscas y cuál es tu presupuesto aproximado?"
             
-            # 4. Consultar productos (simulado)
+            # 4. Consultar productos (catálogo regional, simulado si está vacío)
             productos = [
                 {{
                     "nombre": "Refrigerador Samsung RF28T5001SR",
@@ -161,29 +248,16 @@ def lambda_handler(event, context):
                     "descripcion": "Lavadora de carga frontal 4.5 cu ft con TurboWash"
                 }}
             ]
+            catalogo = cargar_catalogo()
+            if catalogo:
+                productos = catalogo[:2]
             
-            # 5. Guardar en DynamoDB
-            try:
-                dynamodb = boto3.resource('dynamodb')
-                table = dynamodb.Table('{conversations_table.table_name}')
-                table.put_item(
-                    Item={{
-                        'user_email': user_email,
-                        'timestamp': datetime.now().isoformat(),
-                        'mensaje': mensaje_procesado,
-                        'respuesta': respuesta,
-                        'productos_mostrados': json.dumps(productos)
-                    }}
-                )
-            except Exception as e:
-                print(f"Error guardando en DynamoDB: {{e}}")
-            
-            # 6. Generar audio si es necesario
+            # 5. Generar audio si es necesario
             audio_url = None
             if audio_data:
                 try:
-                    polly_client = boto3.client('polly')
-                    s3_client = boto3.client('s3')
+                    polly_client = boto3.client('polly', region_name=REGION)
+                    s3_client = boto3.client('s3', region_name=REGION)
                     
                     response = polly_client.synthesize_speech(
                         Text=respuesta,
@@ -196,13 +270,13 @@ def lambda_handler(event, context):
                     key = f"audio/{{user_email}}/{{timestamp_str}}.mp3"
                     
                     s3_client.put_object(
-                        Bucket='{audio_bucket.bucket_name}',
+                        Bucket=S3_BUCKET,
                         Key=key,
                         Body=response['AudioStream'].read(),
                         ContentType='audio/mpeg'
                     )
                     
-                    audio_url = f"https://{audio_bucket.bucket_name}.s3.amazonaws.com/{{key}}"
+                    audio_url = f"https://{{AUDIO_BUCKET_DOMAIN}}/{{key}}"
                     
                 except Exception as e:
                     print(f"Error generando audio: {{e}}")
@@ -215,6 +289,26 @@ def lambda_handler(event, context):
             'intencion': intencion
         }}
         
+        # Latencia con la respuesta completa (incluye Polly y S3), sin la escritura del historial
+        latencia_ms = int((time.time() - inicio) * 1000)
+        
+        # 6. Guardar en DynamoDB todos los turnos, con su intención
+        try:
+            table = dynamodb.Table(TABLE_NAME)
+            table.put_item(
+                Item={{
+                    'user_email': user_email,
+                    'timestamp': datetime.now().isoformat(),
+                    'mensaje': mensaje_procesado,
+                    'respuesta': respuesta,
+                    'intencion': intencion,
+                    'productos_mostrados': json.dumps(productos),
+                    'latencia_ms': latencia_ms
+                }}
+            )
+        except Exception as e:
+            print(f"Error guardando en DynamoDB: {{e}}")
+        
         return {{
             'statusCode': 200,
             'headers': {{
@@ -242,18 +336,40 @@ def lambda_handler(event, context):
             role=lambda_role,
             environment={
                 'S3_BUCKET': audio_bucket.bucket_name,
-                'DYNAMODB_TABLE': conversations_table.table_name
+                'AUDIO_BUCKET_DOMAIN': audio_bucket.bucket_regional_domain_name,
+                'DYNAMODB_TABLE': conversations_table.table_name,
+                'CATALOG_TABLE': catalog_table.table_name
             }
         )
 
         # Permisos para acceder a recursos
         audio_bucket.grant_read_write(bot_lambda)
         conversations_table.grant_read_write_data(bot_lambda)
+        catalog_table.grant_read_data(bot_lambda)
+
+        # Dominio propio regional para el enrutamiento DNS por latencia
+        api_domain = None
+        if domain_name:
+            hosted_zone = route53.HostedZone.from_hosted_zone_attributes(self, "HostedZone",
+                hosted_zone_id=hosted_zone_id,
+                zone_name=hosted_zone_name
+            )
+            certificate = acm.Certificate(self, "ApiCertificate",
+                domain_name=domain_name,
+                validation=acm.CertificateValidation.from_dns(hosted_zone)
+            )
+            api_domain = apigateway.DomainNameOptions(
+                domain_name=domain_name,
+                certificate=certificate,
+                endpoint_type=apigateway.EndpointType.REGIONAL
+            )
 
         # API Gateway
         api = apigateway.RestApi(self, "BotAPI",
             rest_api_name="ChatAPI",
             description="API para bot de asistencia de compras",
+            endpoint_types=[apigateway.EndpointType.REGIONAL] if api_domain else None,
+            domain_name=api_domain,
             default_cors_preflight_options=apigateway.CorsOptions(
                 allow_origins=apigateway.Cors.ALL_ORIGINS,
                 allow_methods=apigateway.Cors.ALL_METHODS,
@@ -288,15 +404,26 @@ def lambda_handler(event, context):
             ]
         )
 
+        # Registro de latencia: Route 53 responde con la API de la región más cercana
+        if domain_name:
+            route53.ARecord(self, "ApiLatencyRecord",
+                zone=hosted_zone,
+                record_name=domain_name,
+                target=route53.RecordTarget.from_alias(targets.ApiGateway(api)),
+                region=self.region,
+                set_identifier=f"bot-compras-{self.region}"
+            )
+
         # Outputs
-        CfnOutput(self, "UserPoolId", 
-            value=user_pool.user_pool_id,
-            description="ID del User Pool de Cognito"
-        )
-        CfnOutput(self, "UserPoolClientId", 
-            value=user_pool_client.user_pool_client_id,
-            description="ID del Client del User Pool"
-        )
+        if is_primary:
+            CfnOutput(self, "UserPoolId", 
+                value=user_pool.user_pool_id,
+                description="ID del User Pool de Cognito"
+            )
+            CfnOutput(self, "UserPoolClientId", 
+                value=user_pool_client.user_pool_client_id,
+                description="ID del Client del User Pool"
+            )
         CfnOutput(self, "APIEndpoint", 
             value=api.url,
             description="URL del API Gateway"
@@ -309,3 +436,38 @@ def lambda_handler(event, context):
             value=conversations_table.table_name,
             description="Nombre de la tabla DynamoDB"
         )
+        CfnOutput(self, "CatalogTableName", 
+            value=catalog_table.table_name,
+            description="Nombre de la tabla DynamoDB del catálogo"
+        )
+
+
+def build_regional_stacks(scope: Construct, construct_id: str,
+                          primary_region: str,
+                          replica_regions: list,
+                          account: str = None,
+                          **kwargs) -> dict:
+    """Crear el stack primario (tablas globales) y un stack por cada región réplica"""
+    if isinstance(replica_regions, str) or not all(isinstance(region, str) for region in replica_regions):
+        raise TypeError("replica_regions debe ser una lista de regiones, p. ej. ['sa-east-1']")
+    if primary_region in replica_regions:
+        raise ValueError(f"La región primaria {primary_region} no puede ser también réplica")
+
+    stacks = {}
+    for region in [primary_region] + list(replica_regions):
+        # El stack primario conserva el id original; su tabla `conversaciones` mantiene
+        # tipo e id lógico y solo se le añaden réplicas, sin reemplazarla
+        stack_id = construct_id if region == primary_region else f"{construct_id}-{region}"
+        stacks[region] = BotComprasStack(scope, stack_id,
+            env=Environment(account=account, region=region),
+            primary_region=primary_region,
+            replica_regions=replica_regions,
+            **kwargs
+        )
+
+    # Las réplicas de DynamoDB las crea el stack primario
+    for region, stack in stacks.items():
+        if region != primary_region:
+            stack.add_stack_dependency(stacks[primary_region])
+
+    return stacks
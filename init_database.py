@@ -4,6 +4,18 @@ Script para inicializar la base de datos RDS con productos de electrodomésticos
 """
 import boto3
 import json
+import os
+import sys
+from decimal import Decimal
+
+# Datos de productos
+PRODUCTOS_DATA = [
+    ('Refrigerador Samsung RF28T5001SR', 'Refrigeración', '178x91x70 cm', 'Acero Inoxidable', 'USB, WiFi', '450 kWh/año', '2 años', 1299.99, 'https://tienda.com/productos/refrigerador-samsung-rf28t5001sr', 15, 'Refrigerador de 28 pies cúbicos con tecnología Twin Cooling Plus'),
+    ('Lavadora LG WM3900HWA', 'Lavandería', '89x69x74 cm', 'Blanco', 'WiFi, Bluetooth', '150 kWh/año', '1 año', 899.99, 'https://tienda.com/productos/lavadora-lg-wm3900hwa', 8, 'Lavadora de carga frontal 4.5 cu ft con TurboWash'),
+    ('Microondas Panasonic NN-SN966S', 'Cocina', '56x48x37 cm', 'Acero Inoxidable', 'Ninguno', '1200W', '1 año', 199.99, 'https://tienda.com/productos/microondas-panasonic-nn-sn966s', 25, 'Microondas de 2.2 cu ft con tecnología Inverter'),
+    ('Lavavajillas Bosch SHPM88Z75N', 'Cocina', '86x60x55 cm', 'Acero Inoxidable', 'WiFi', '240 kWh/año', '1 año', 1199.99, 'https://tienda.com/productos/lavavajillas-bosch-shpm88z75n', 12, 'Lavavajillas empotrable con 16 servicios de mesa'),
+    ('Aspiradora Dyson V15 Detect', 'Limpieza', '126x25x25 cm', 'Amarillo/Púrpura', 'USB-C', '230W', '2 años', 749.99, 'https://tienda.com/productos/aspiradora-dyson-v15-detect', 20, 'Aspiradora inalámbrica con detección láser de polvo')
+]
 
 def create_rds_cluster():
     """Crear cluster RDS Serverless"""
@@ -94,18 +106,54 @@ def init_database_with_data():
     );
     """
     
-    # Datos de productos
-    productos_data = [
-        ('Refrigerador Samsung RF28T5001SR', 'Refrigeración', '178x91x70 cm', 'Acero Inoxidable', 'USB, WiFi', '450 kWh/año', '2 años', 1299.99, 'https://tienda.com/productos/refrigerador-samsung-rf28t5001sr', 15, 'Refrigerador de 28 pies cúbicos con tecnología Twin Cooling Plus'),
-        ('Lavadora LG WM3900HWA', 'Lavandería', '89x69x74 cm', 'Blanco', 'WiFi, Bluetooth', '150 kWh/año', '1 año', 899.99, 'https://tienda.com/productos/lavadora-lg-wm3900hwa', 8, 'Lavadora de carga frontal 4.5 cu ft con TurboWash'),
-        ('Microondas Panasonic NN-SN966S', 'Cocina', '56x48x37 cm', 'Acero Inoxidable', 'Ninguno', '1200W', '1 año', 199.99, 'https://tienda.com/productos/microondas-panasonic-nn-sn966s', 25, 'Microondas de 2.2 cu ft con tecnología Inverter'),
-        ('Lavavajillas Bosch SHPM88Z75N', 'Cocina', '86x60x55 cm', 'Acero Inoxidable', 'WiFi', '240 kWh/año', '1 año', 1199.99, 'https://tienda.com/productos/lavavajillas-bosch-shpm88z75n', 12, 'Lavavajillas empotrable con 16 servicios de mesa'),
-        ('Aspiradora Dyson V15 Detect', 'Limpieza', '126x25x25 cm', 'Amarillo/Púrpura', 'USB-C', '230W', '2 años', 749.99, 'https://tienda.com/productos/aspiradora-dyson-v15-detect', 20, 'Aspiradora inalámbrica con detección láser de polvo')
-    ]
-    
     print("Base de datos inicializada con productos de electrodomésticos")
     print("Nota: Para usar RDS Data API se requiere configuración adicional de secrets manager")
 
+def region_primaria():
+    """Región primaria: BOT_COMPRAS_PRIMARY_REGION, `bot-compras:primaryRegion` de cdk.json o la región por defecto de AWS"""
+    region = os.getenv('BOT_COMPRAS_PRIMARY_REGION')
+    if not region:
+        try:
+            with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cdk.json')) as f:
+                region = json.load(f).get('context', {}).get('bot-compras:primaryRegion')
+        except (OSError, ValueError) as e:
+            print(f"No se pudo leer cdk.json: {e}")
+    return region or boto3.session.Session().region_name
+
+def init_catalogo_dynamodb(region=None, table_name='catalogo'):
+    """Cargar el snapshot del catálogo en la tabla global; DynamoDB lo replica al resto de regiones"""
+    region = region or region_primaria()
+    if not region:
+        print("Error: no se pudo determinar la región primaria (BOT_COMPRAS_PRIMARY_REGION o cdk.json)")
+        return False
+
+    table = boto3.resource('dynamodb', region_name=region).Table(table_name)
+
+    try:
+        with table.batch_writer() as batch:
+            for i, producto in enumerate(PRODUCTOS_DATA, start=1):
+                (nombre, categoria, dimensiones, color, puertos, consumo,
+                 garantia, costo, url_producto, stock, descripcion) = producto
+                batch.put_item(Item={
+                    'id': i,
+                    'nombre': nombre,
+                    'categoria': categoria,
+                    'dimensiones': dimensiones,
+                    'color': color,
+                    'puertos': puertos,
+                    'consumo_energetico': consumo,
+                    'garantia': garantia,
+                    'costo': Decimal(str(costo)),
+                    'url_producto': url_producto,
+                    'stock': stock,
+                    'descripcion': descripcion
+                })
+        print(f"Catálogo cargado en {table_name} ({region}): {len(PRODUCTOS_DATA)} productos")
+        return True
+    except Exception as e:
+        print(f"Error cargando catálogo en DynamoDB: {e}")
+        return False
+
 if __name__ == "__main__":
     print("Inicializando base de datos...")
     
@@ -115,4 +163,9 @@ if __name__ == "__main__":
     
     # Los datos ya están incluidos en el código de la Lambda como simulación
     print("Datos de productos disponibles en la Lambda function")
+
+    # Snapshot del catálogo para las Lambdas regionales
+    if not init_catalogo_dynamodb():
+        print("❌ No se pudo cargar el catálogo")
+        sys.exit(1)
     print("✅ Infraestructura base completada")
@@ -0,0 +1,110 @@
+import json
+
+import pytest
+
+from bot_compras import analytics
+
+PRODUCTOS = [
+    {"nombre": "Refrigerador Samsung RF28T5001SR", "costo": 1299.99},
+    {"nombre": "Lavadora LG WM3900HWA", "costo": 899.99},
+]
+
+
+def _items():
+    # Formato del cliente de bajo nivel de DynamoDB
+    return [
+        {
+            "user_email": {"S": "a@test.com"},
+            "timestamp": {"S": "2024-01-01T10:00:00"},
+            "mensaje": {"S": "Quiero una lavadora"},
+            "intencion": {"S": "compra"},
+            "productos_mostrados": {"S": json.dumps(PRODUCTOS)},
+            "latencia_ms": {"N": "120"},
+        },
+        {
+            "user_email": {"S": "b@test.com"},
+            "timestamp": {"S": "2024-01-01T10:05:00"},
+            "mensaje": {"S": "Tengo un problema"},
+            "intencion": {"S": "soporte"},
+            "productos_mostrados": {"S": "[]"},
+            "latencia_ms": {"N": "40"},
+        },
+        {
+            # Turno anterior a registrar intención y latencia
+            "user_email": {"S": "c@test.com"},
+            "timestamp": {"S": "2023-12-31T09:00:00"},
+            "mensaje": {"S": "Busco microondas"},
+            "productos_mostrados": {"S": json.dumps(PRODUCTOS[:1])},
+        },
+    ]
+
+
+def test_columnas_de_pagina():
+    turnos, productos = analytics.columnas_de_pagina(_items()[2:])
+
+    assert turnos["intencion"] == ["compra"]
+    assert turnos["num_productos"] == [1]
+    assert turnos["latencia_ms"] == [None]
+    assert productos["categoria"] == ["Refrigeración"]
+    assert productos["costo"] == [1299.99]
+
+
+def test_exportar_y_consultar(tmp_path):
+    salida = str(tmp_path)
+    items = _items()
+    turnos, productos = analytics.exportar_conversaciones(
+        salida, paginas=[items[:2], items[2:]], chunk_size=2
+    )
+
+    assert (turnos, productos) == (3, 3)
+    assert analytics.mezcla_intenciones(salida) == {"compra": 2, "soporte": 1}
+    assert analytics.productos_por_turno(salida) == {0: 1, 1: 1, 2: 1}
+
+    latencia = analytics.distribucion_latencia(salida, percentiles=(50, 99))
+    assert latencia == {"total": 2, "p50": 40, "p99": 120}
+
+    assert analytics.categorias_y_bandas(salida) == {
+        ("Refrigeración", "1000-2000"): 2,
+        ("Lavandería", "500-1000"): 1,
+    }
+
+
+def test_exportar_no_mezcla_exportaciones_previas(tmp_path):
+    salida = str(tmp_path)
+    analytics.exportar_conversaciones(salida, paginas=[_items()])
+
+    with pytest.raises(FileExistsError):
+        analytics.exportar_conversaciones(salida, paginas=[_items()[:1]])
+
+    analytics.exportar_conversaciones(salida, paginas=[_items()[:1]], sobrescribir=True)
+    assert analytics.mezcla_intenciones(salida) == {"compra": 1}
+
+
+def test_categoria_producto_usa_categorias_del_catalogo():
+    # Los turnos antiguos (sin categoría) y los nuevos (con categoría) comparten clave
+    assert analytics.categoria_producto({"nombre": "Lavadora LG WM3900HWA"}) == "Lavandería"
+    assert analytics.categoria_producto({"nombre": "Lavadora LG", "categoria": "Lavandería"}) == "Lavandería"
+    assert analytics.categoria_producto({"nombre": "Televisor Sony"}) == "desconocida"
+
+
+def test_reporte_sin_productos_y_sin_turnos(tmp_path):
+    # Solo turnos de soporte: productos/ queda sin archivos
+    solo_soporte = str(tmp_path / "soporte")
+    assert analytics.exportar_conversaciones(solo_soporte, paginas=[_items()[1:2]]) == (1, 0)
+    analytics.imprimir_reporte(solo_soporte)
+    assert analytics.categorias_y_bandas(solo_soporte) == {}
+
+    # Tabla vacía: ni turnos ni productos
+    vacia = str(tmp_path / "vacia")
+    assert analytics.exportar_conversaciones(vacia, paginas=[]) == (0, 0)
+    analytics.imprimir_reporte(vacia)
+    assert analytics.mezcla_intenciones(vacia) == {}
+    assert analytics.productos_por_turno(vacia) == {}
+    assert analytics.distribucion_latencia(vacia) == {"total": 0}
+    assert analytics.categorias_y_bandas(vacia) == {}
+
+
+@pytest.mark.parametrize("kwargs", [{"segmentos": 0}, {"segmentos": -1}, {"chunk_size": 0}])
+def test_exportar_rechaza_parametros_invalidos(tmp_path, kwargs):
+    with pytest.raises(ValueError):
+        analytics.exportar_conversaciones(str(tmp_path), paginas=[_items()], **kwargs)
@@ -1,7 +1,8 @@
+import pytest
 import aws_cdk as core
 import aws_cdk.assertions as assertions
 
-from bot_compras.bot_compras_stack import BotComprasStack
+from bot_compras.bot_compras_stack import BotComprasStack, build_regional_stacks
 
 # example tests. To run these tests, uncomment this file along with the example
 # resource in bot_compras/bot_compras_stack.py
@@ -13,3 +14,133 @@ def test_sqs_queue_created():
 #     template.has_resource_properties("AWS::SQS::Queue", {
 #         "VisibilityTimeout": 300
 #     })
+
+
+def _regional_templates(**kwargs):
+    # Mismo flag que cdk.json: las réplicas heredan la política de retención de la tabla
+    app = core.App(context={"@aws-cdk/aws-dynamodb:retainTableReplica": True})
+    stacks = build_regional_stacks(app, "bot-compras",
+        primary_region="us-west-2",
+        replica_regions=["sa-east-1"],
+        account="123456789012",
+        domain_name="api.tienda.com",
+        hosted_zone_id="Z0123456789",
+        hosted_zone_name="tienda.com",
+        **kwargs
+    )
+    return stacks, {region: assertions.Template.from_stack(stack) for region, stack in stacks.items()}
+
+
+def test_global_tables_created_in_primary_region():
+    stacks, templates = _regional_templates()
+    primary = templates["us-west-2"]
+
+    # Las tablas se convierten en globales en el sitio, sin cambiar de tipo
+    primary.resource_count_is("AWS::DynamoDB::GlobalTable", 0)
+    primary.resource_count_is("AWS::DynamoDB::Table", 2)
+    primary.has_resource("AWS::DynamoDB::Table", {
+        "Properties": assertions.Match.object_like({"TableName": "conversaciones"}),
+        "DeletionPolicy": "Retain",
+        "UpdateReplacePolicy": "Retain"
+    })
+    primary.has_resource_properties("Custom::DynamoDBReplica", {
+        "TableName": {"Ref": assertions.Match.string_like_regexp("ConversationsTable")},
+        "Region": "sa-east-1",
+        "SkipReplicaDeletion": True
+    })
+    primary.resource_count_is("AWS::Cognito::UserPool", 1)
+
+    # La región réplica no crea tablas ni Cognito y se despliega después de la primaria
+    replica = templates["sa-east-1"]
+    replica.resource_count_is("AWS::DynamoDB::GlobalTable", 0)
+    replica.resource_count_is("AWS::DynamoDB::Table", 0)
+    replica.resource_count_is("AWS::Cognito::UserPool", 0)
+    assert stacks["us-west-2"] in stacks["sa-east-1"].dependencies
+
+
+def test_primary_region_keeps_single_region_history_table():
+    app = core.App()
+    single = assertions.Template.from_stack(BotComprasStack(app, "BotComprasStack"))
+    _, templates = _regional_templates()
+
+    # Activar multi-región no debe reemplazar la tabla del despliegue existente
+    def history_tables(template):
+        return {
+            logical_id: resource["Type"]
+            for logical_id, resource in template.find_resources("AWS::DynamoDB::Table").items()
+            if resource["Properties"]["TableName"] == "conversaciones"
+        }
+
+    assert history_tables(single) == history_tables(templates["us-west-2"])
+    single.has_resource("AWS::DynamoDB::Table", {
+        "Properties": assertions.Match.object_like({"TableName": "conversaciones"}),
+        "DeletionPolicy": "Retain"
+    })
+
+
+def test_regional_resources_wired_consistently():
+    stacks, templates = _regional_templates()
+
+    for region, template in templates.items():
+        template.resource_count_is("AWS::S3::Bucket", 1)
+        template.has_resource_properties("AWS::Lambda::Function", {
+            "FunctionName": "bot-main",
+            "Environment": {
+                "Variables": assertions.Match.object_like({
+                    "S3_BUCKET": {"Ref": assertions.Match.string_like_regexp("AudioBucket")},
+                    "AUDIO_BUCKET_DOMAIN": {
+                        "Fn::GetAtt": [assertions.Match.string_like_regexp("AudioBucket"), "RegionalDomainName"]
+                    }
+                })
+            }
+        })
+        template.has_resource_properties("AWS::ApiGateway::RestApi", {
+            "EndpointConfiguration": {"Types": ["REGIONAL"]}
+        })
+        template.has_resource_properties("AWS::Route53::RecordSet", {
+            "Name": "api.tienda.com.",
+            "Type": "A",
+            "Region": region,
+            "SetIdentifier": f"bot-compras-{region}"
+        })
+
+    # La primaria referencia sus tablas globales; la réplica usa el mismo nombre en su región
+    templates["us-west-2"].has_resource_properties("AWS::Lambda::Function", {
+        "Environment": {
+            "Variables": assertions.Match.object_like({
+                "DYNAMODB_TABLE": {"Ref": assertions.Match.string_like_regexp("ConversationsTable")},
+                "CATALOG_TABLE": {"Ref": assertions.Match.string_like_regexp("CatalogTable")}
+            })
+        }
+    })
+    templates["sa-east-1"].has_resource_properties("AWS::Lambda::Function", {
+        "Environment": {
+            "Variables": assertions.Match.object_like({
+                "DYNAMODB_TABLE": "conversaciones",
+                "CATALOG_TABLE": "catalogo"
+            })
+        }
+    })
+
+    # Los permisos de la réplica apuntan a las tablas de su propia región
+    templates["sa-east-1"].has_resource_properties("AWS::IAM::Policy", {
+        "PolicyDocument": {
+            "Statement": assertions.Match.array_with([
+                assertions.Match.object_like({
+                    "Resource": assertions.Match.array_with([{
+                        "Fn::Join": ["", assertions.Match.array_with([
+                            ":dynamodb:sa-east-1:123456789012:table/conversaciones"
+                        ])]
+                    }])
+                })
+            ])
+        }
+    })
+
+
+def test_build_regional_stacks_rejects_region_string():
+    with pytest.raises(TypeError):
+        build_regional_stacks(core.App(), "bot-compras",
+            primary_region="us-west-2",
+            replica_regions="sa-east-1"
+        )